@@ -1,8 +1,11 @@
 import os
+import json # For streaming metadata as NDJSON
+import logging
 import requests
 import subprocess # Added for running scraper
 import sys # Added for getting python executable
-from flask import Flask, request, render_template_string, flash, redirect, url_for, session # Added session
+from concurrent.futures import ThreadPoolExecutor, as_completed # For concurrent metadata lookups
+from flask import Flask, request, render_template_string, flash, redirect, url_for, session, Response, stream_with_context # Added session
 from dotenv import load_dotenv, set_key, find_dotenv
 
 # Find the .env file
@@ -166,6 +169,7 @@ HTML_TEMPLATE = """
                     <option value="{{ base.id }}" {{ 'selected' if base.id == config.AIRTABLE_BASE_ID }}>{{ base.name }} ({{ base.id }})</option>
                 {% endfor %}
             </select>
+            <small id="metadata-status"></small> <!-- Progress of the streamed base/table lookup -->
             <!-- Hidden submit button triggered by onchange, not really needed now -->
              <button type="submit" name="action" value="fetch_tables" class="hidden">Fetch Tables</button>
         </div>
@@ -175,17 +179,89 @@ HTML_TEMPLATE = """
         <div id="final-step-div" class="form-group {{ 'hidden' if not config.AIRTABLE_BASE_ID }}"> <!-- Show only when Base is selected -->
              <input type="hidden" name="access_token_hidden_2" value="{{ config.AIRTABLE_ACCESS_TOKEN }}"> <!-- Carry token forward -->
              <input type="hidden" name="selected_base_id_hidden" value="{{ config.AIRTABLE_BASE_ID }}"> <!-- Carry base_id forward -->
-            <label for="zip_code">Zillow ZIP Code (for scraping and table name):</label>
-            <input type="text" id="zip_code" name="zip_code" value="{{ config.ZILLOW_ZIP_CODE }}" pattern="[0-9]{5}" title="Enter a 5-digit ZIP code" required>
+            <label for="zip_code">Zillow ZIP Code(s) (for scraping and table names; separate several with commas):</label>
+            <input type="text" id="zip_code" name="zip_code" value="{{ config.ZILLOW_ZIP_CODE }}" pattern="\\s*[0-9]{5}([,\\s]+[0-9]{5})*[,\\s]*" title="Enter one or more 5-digit ZIP codes, separated by commas" required>
             <button type="button" id="save-config-btn">Save Configuration</button>
         </div>
     </form>
     </div> <!-- Close container -->
 
     <script>
-        document.getElementById('fetch-bases-btn').addEventListener('click', function() {
+        // Fallback: plain form submit (used if streaming is unsupported or fails)
+        function submitFetchBases() {
             document.getElementById('form_action').value = 'fetch_bases';
             document.getElementById('config-form').submit();
+        }
+
+        // Stream bases and table lists from /metadata_stream so the base dropdown is usable
+        // as soon as the first page of bases arrives, instead of after every lookup finishes.
+        async function streamMetadata() {
+            const token = document.getElementById('access_token').value;
+            const select = document.getElementById('base_id');
+            const status = document.getElementById('metadata-status');
+            const zipTables = document.getElementById('zip_code').value.split(/[\\s,]+/).filter(Boolean).map(function(z) { return 'ZIP_' + z; });
+            const savedBaseId = {{ (config.AIRTABLE_BASE_ID or '')|tojson }}; // Keep the saved base selected, like the server-rendered list
+            const baseLabels = {};
+
+            select.length = 1; // Keep only the "-- Select a Base --" placeholder
+            document.getElementById('base-select-div').classList.remove('hidden');
+            status.textContent = 'Loading bases...';
+
+            const response = await fetch("{{ url_for('metadata_stream') }}", {
+                method: 'POST',
+                headers: {'Content-Type': 'application/x-www-form-urlencoded'},
+                body: new URLSearchParams({access_token: token})
+            });
+            if (!response.ok || !response.body) throw new Error('Metadata stream unavailable');
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let errors = 0;
+            const handleEvent = function(event) {
+                if (event.type === 'bases') {
+                    event.bases.forEach(function(base) {
+                        baseLabels[base.id] = base.name + ' (' + base.id + ')';
+                        const isSaved = base.id === savedBaseId;
+                        select.add(new Option(baseLabels[base.id] + ' - loading tables...', base.id, isSaved, isSaved));
+                    });
+                    status.textContent = (select.length - 1) + ' bases loaded, fetching tables...';
+                } else if (event.type === 'tables') {
+                    const option = select.querySelector('option[value="' + event.base_id + '"]');
+                    if (!option) return;
+                    const found = zipTables.filter(function(name) { return event.tables.some(function(t) { return t.name === name; }); });
+                    option.text = baseLabels[event.base_id] + ' - ' + event.tables.length + ' tables' + (found.length ? ', has ' + found.join(', ') : '');
+                } else if (event.type === 'error') {
+                    errors += 1;
+                    const option = event.base_id && select.querySelector('option[value="' + event.base_id + '"]');
+                    if (option) {
+                        option.text = baseLabels[event.base_id] + ' - tables unavailable';
+                    } else {
+                        status.textContent = event.message;
+                    }
+                } else if (event.type === 'done') {
+                    status.textContent = event.base_count + ' bases loaded' + (errors ? ' (' + errors + ' errors)' : '') + '.';
+                }
+            };
+            while (true) {
+                const {value, done} = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, {stream: true});
+                const lines = buffer.split('\\n');
+                buffer = lines.pop(); // Keep any partial line for the next chunk
+                lines.filter(function(line) { return line.trim(); }).forEach(function(line) { handleEvent(JSON.parse(line)); });
+            }
+        }
+
+        document.getElementById('fetch-bases-btn').addEventListener('click', function() {
+            if (!window.fetch || !window.TextDecoder) {
+                submitFetchBases();
+                return;
+            }
+            streamMetadata().catch(function(err) {
+                console.error(err);
+                submitFetchBases();
+            });
         });
 
         // Add listener for the Save button
@@ -212,14 +288,20 @@ def get_current_config():
     }
 
 # --- Airtable API Helper Functions ---
-def get_airtable_metadata(token, endpoint):
-    """Generic function to call Airtable Metadata API."""
+# Max parallel Metadata API calls. Airtable allows 5 requests/sec per base, so keep this small.
+METADATA_MAX_WORKERS = 4
+
+def _request_airtable_metadata(token, endpoint, params=None):
+    """Calls the Airtable Metadata API without touching Flask state (safe to run in worker threads).
+
+    Returns a (data, error_message) tuple; exactly one of them is None.
+    """
     headers = {"Authorization": f"Bearer {token}"}
     url = f"https://api.airtable.com/v0/meta/{endpoint}"
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.get(url, headers=headers, params=params, timeout=10)
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        return response.json()
+        return response.json(), None
     except requests.exceptions.RequestException as e:
         error_message = f"Error calling Airtable Metadata API ({endpoint}): {e}"
         if e.response is not None:
@@ -238,23 +320,96 @@ def get_airtable_metadata(token, endpoint):
 
             except ValueError: # If response is not JSON
                  error_message += f" - Status: {e.response.status_code}, Response: {e.response.text[:200]}"
-        flash(error_message, 'error')
-        return None
+        return None, error_message
     except Exception as e: # Catch other potential errors
-        flash(f"An unexpected error occurred: {e}", 'error')
-        return None
+        return None, f"An unexpected error occurred: {e}"
+
+def get_airtable_metadata(token, endpoint, params=None):
+    """Generic function to call Airtable Metadata API."""
+    data, error_message = _request_airtable_metadata(token, endpoint, params=params)
+    if error_message:
+        flash(error_message, 'error')
+    return data
+
+def _iter_airtable_base_pages(token):
+    """Yields (bases, error_message) for each page of the bases list, following Airtable's `offset` cursor."""
+    offset = None
+    while True:
+        params = {"offset": offset} if offset else None
+        data, error_message = _request_airtable_metadata(token, "bases", params=params)
+        if error_message:
+            yield [], error_message
+            return
+        yield data.get('bases', []), None
+        offset = data.get('offset')
+        if not offset:
+            return
+
+def _collect_airtable_bases(token):
+    """Collects every page of bases. Returns (bases, error_message); bases holds whatever loaded before an error."""
+    bases = []
+    for page, error_message in _iter_airtable_base_pages(token):
+        if error_message:
+            return bases, error_message
+        bases.extend(page)
+    return bases, None
 
 def get_airtable_bases(token):
-    """Fetches list of bases accessible by the token."""
+    """Fetches list of bases accessible by the token (all pages)."""
     if not token: return []
-    data = get_airtable_metadata(token, "bases")
-    return data.get('bases', []) if data else []
+    bases, error_message = _collect_airtable_bases(token)
+    if error_message:
+        flash(error_message, 'error')
+    return bases
 
 def get_airtable_tables(token, base_id):
     """Fetches list of tables for a given base."""
     if not token or not base_id: return []
     data = get_airtable_metadata(token, f"bases/{base_id}/tables")
     return data.get('tables', []) if data else []
+
+def iter_airtable_metadata(token, max_workers=METADATA_MAX_WORKERS):
+    """Yields metadata events as soon as each Airtable call returns.
+
+    Base pages are fetched in order (each page needs the previous `offset`), while the
+    table list of every base is fetched concurrently on a bounded thread pool as soon as
+    the base is known. Events are dicts with a "type" of 'bases', 'tables', 'error' or 'done'.
+    """
+    if not token:
+        yield {"type": "error", "message": "Please enter an Airtable Access Token."}
+        return
+
+    base_count = 0
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {}
+        for page, error_message in _iter_airtable_base_pages(token):
+            if error_message:
+                yield {"type": "error", "message": error_message}
+                break
+            base_count += len(page)
+            yield {"type": "bases", "bases": [{"id": b['id'], "name": b.get('name', b['id'])} for b in page]}
+            for base in page:
+                futures[executor.submit(_request_airtable_metadata, token, f"bases/{base['id']}/tables")] = base['id']
+            # Flush any table lists that finished while we were paging through bases
+            for future in [f for f in futures if f.done()]:
+                yield _table_event(futures.pop(future), future)
+
+        for future in as_completed(list(futures)):
+            yield _table_event(futures.pop(future), future)
+    finally:
+        # If the generator is closed early (client disconnected), drop the table lookups still queued
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    yield {"type": "done", "base_count": base_count}
+
+def _table_event(base_id, future):
+    """Converts a completed table-list future into a metadata event."""
+    data, error_message = future.result()
+    if error_message:
+        return {"type": "error", "base_id": base_id, "message": error_message}
+    tables = [{"id": t['id'], "name": t.get('name', t['id'])} for t in data.get('tables', [])]
+    return {"type": "tables", "base_id": base_id, "tables": tables}
 # --- End Airtable API Helpers ---
 
 
@@ -302,9 +457,10 @@ def config_page():
 
             # Basic validation - removed table_name_to_save
             if token_to_save and base_id_to_save and zip_code_to_save:
-                # Add ZIP code validation (basic 5 digits)
-                if not (zip_code_to_save and zip_code_to_save.isdigit() and len(zip_code_to_save) == 5):
-                     flash('Invalid ZIP Code format. Please enter 5 digits.', 'error')
+                # Add ZIP code validation (one or more 5-digit ZIPs, same list format run_scraper and the scraper accept)
+                zip_codes_to_save = zip_code_to_save.replace(",", " ").split()
+                if not zip_codes_to_save or not all(z.isdigit() and len(z) == 5 for z in zip_codes_to_save):
+                     flash('Invalid ZIP Code format. Please enter one or more 5-digit ZIP codes, separated by commas.', 'error')
                      # Repopulate bases if save fails
                      if access_token: bases = get_airtable_bases(access_token)
                      # No tables to repopulate
@@ -314,7 +470,7 @@ def config_page():
                         set_key(dotenv_path, "AIRTABLE_ACCESS_TOKEN", token_to_save)
                         set_key(dotenv_path, "AIRTABLE_BASE_ID", base_id_to_save)
                         # set_key(dotenv_path, "AIRTABLE_TABLE_NAME", table_name_to_save) # Removed
-                        set_key(dotenv_path, "ZILLOW_ZIP_CODE", zip_code_to_save)
+                        set_key(dotenv_path, "ZILLOW_ZIP_CODE", ",".join(zip_codes_to_save))
                         flash('Configuration saved successfully!', 'success')
                         session['show_run_button'] = True # Set flag to show button after redirect
                         # Redirect to GET to show the final saved state cleanly and prevent resubmission
@@ -334,11 +490,20 @@ def config_page():
         # If it's a POST but not 'fetch_bases' or 'save_config', and base wasn't just selected,
         # it might be an intermediate state (e.g., table selected). We still need to populate bases/tables.
         elif access_token:
-             bases = get_airtable_bases(access_token)
-             if bases is None: bases = []
              if selected_base_id:
-                 tables = get_airtable_tables(access_token, selected_base_id)
-                 if tables is None: tables = []
+                 # Tables for the selected base don't depend on the base list, so fetch both at once.
+                 # Errors are collected and flashed here since worker threads have no request context.
+                 with ThreadPoolExecutor(max_workers=2) as executor:
+                     bases_future = executor.submit(_collect_airtable_bases, access_token)
+                     tables_future = executor.submit(_request_airtable_metadata, access_token, f"bases/{selected_base_id}/tables")
+                     bases, bases_error = bases_future.result()
+                     tables_data, tables_error = tables_future.result()
+                 for error_message in (bases_error, tables_error):
+                     if error_message: flash(error_message, 'error')
+                 tables = tables_data.get('tables', []) if tables_data else []
+             else:
+                 bases = get_airtable_bases(access_token)
+             if bases is None: bases = []
 
 
     # For GET request: Load config and potentially pre-fetch bases if token exists
@@ -363,6 +528,18 @@ def config_page():
     show_run_button = session.get('show_run_button', False)
 
     return render_template_string(HTML_TEMPLATE, config=config, bases=bases, show_run_button=show_run_button) # Removed tables
+
+@app.route('/metadata_stream', methods=['POST'])
+def metadata_stream():
+    """Streams bases and per-base table lists as newline-delimited JSON while they load."""
+    access_token = request.form.get('access_token') or get_current_config().get('AIRTABLE_ACCESS_TOKEN')
+
+    def generate():
+        for event in iter_airtable_metadata(access_token):
+            yield json.dumps(event) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers={"Cache-Control": "no-cache"})
+
 @app.route('/run_scraper', methods=['GET']) # Keep as GET
 def run_scraper():
     """Triggers the scraper script as a background process."""
@@ -377,7 +554,7 @@ def run_scraper():
         # Updated check: Removed AIRTABLE_TABLE_NAME
         if "YOUR_" in config.get("AIRTABLE_ACCESS_TOKEN", "") or not config.get("AIRTABLE_ACCESS_TOKEN", "").startswith("pat") \
            or "YOUR_" in config.get("AIRTABLE_BASE_ID", "") \
-           or not (config.get("ZILLOW_ZIP_CODE", "").isdigit() and len(config.get("ZILLOW_ZIP_CODE", "")) == 5):
+           or not all(z.isdigit() and len(z) == 5 for z in config.get("ZILLOW_ZIP_CODE", "").replace(",", " ").split()):
              flash("Placeholder values or invalid token/Base ID/ZIP code format detected in .env file. Please correct configuration.", "error")
              return redirect(url_for('config_page'))
 
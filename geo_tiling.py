@@ -0,0 +1,360 @@
+import os
+import json
+import time
+import random
+import logging
+import tempfile
+import threading
+import requests
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, urlparse, parse_qs
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Splits a ZIP code search into map-bounds sub-queries ("tiles") so dense ZIPs aren't limited by the
+# number of results a single Zillow search page returns.
+#
+# Tiles form a quadtree over the ZIP's bounding box: tile "r" is the whole box, "r0".."r3" are its
+# SW/SE/NW/NE quadrants, and so on. Any tile that returns TILE_RESULT_CAP or more listings is assumed
+# to be truncated and is split again (up to TILE_MAX_DEPTH). Tiles are fetched in parallel and their
+# listings are merged by MLS ID, since a listing on a tile edge can show up in neighbouring tiles.
+#
+# Run `python geo_tiling.py` to check the planner offline against a local stand-in listing server.
+
+ZILLOW_BASE_URL = os.getenv("ZILLOW_BASE_URL", "https://www.zillow.com") # Point at a local stand-in server for offline testing
+TILE_RESULT_CAP = int(os.getenv("TILE_RESULT_CAP", "40")) # Listings on one results page; hitting it means "probably truncated"
+TILE_MAX_DEPTH = int(os.getenv("TILE_MAX_DEPTH", "4")) # Up to 4^4 = 256 tiles per ZIP
+TILE_MAX_WORKERS = int(os.getenv("TILE_MAX_WORKERS", "3")) # Parallel browser fetches
+ZIP_BOUNDS_FILE = os.getenv("ZIP_BOUNDS_FILE", "zip_bounds.json") # Cache/override of ZIP bounding boxes
+GEOCODER_URL = "https://nominatim.openstreetmap.org/search"
+
+# A tile whose HTML yields no listings only counts as covered if the page is recognizably a results page;
+# CAPTCHA/block pages and anything unrecognized count as failed so --resume refetches them
+BLOCK_PAGE_MARKERS = ("px-captcha", "captcha-container", "press & hold", "access to this page has been denied")
+RESULTS_PAGE_MARKERS = ('id="grid-search-results"', "search-page-list-container", "no matching results")
+
+# --- ZIP Bounding Boxes ---
+
+def _load_bounds_cache():
+    try:
+        with open(ZIP_BOUNDS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read ZIP bounds file '{ZIP_BOUNDS_FILE}': {e}")
+        return {}
+
+def get_zip_bounds(zip_code):
+    """Returns the bounding box of a ZIP code as {"west", "east", "south", "north"}, or None.
+
+    Bounds are read from ZIP_BOUNDS_FILE first (edit it to override a box), otherwise looked up
+    with the OpenStreetMap Nominatim geocoder and cached in that file.
+    """
+    cache = _load_bounds_cache()
+    if zip_code in cache:
+        return cache[zip_code]
+
+    try:
+        response = requests.get(
+            GEOCODER_URL,
+            params={"postalcode": zip_code, "country": "us", "format": "json", "limit": 1},
+            headers={"User-Agent": "zillow-scraper-to-airtable (ZIP bounds lookup)"},
+            timeout=15)
+        response.raise_for_status()
+        results = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logging.error(f"Failed to look up bounds for ZIP {zip_code}: {e}")
+        return None
+    if not results:
+        logging.error(f"No bounding box found for ZIP {zip_code}.")
+        return None
+
+    south, north, west, east = (float(v) for v in results[0]["boundingbox"])
+    bounds = {"west": west, "east": east, "south": south, "north": north}
+    cache[zip_code] = bounds
+    try:
+        with open(ZIP_BOUNDS_FILE, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        logging.warning(f"Could not cache ZIP bounds to '{ZIP_BOUNDS_FILE}': {e}")
+    return bounds
+
+# --- Tile Planning ---
+
+def split_bounds(bounds):
+    """Splits a bounding box into four quadrants, ordered SW, SE, NW, NE."""
+    mid_lng = (bounds["west"] + bounds["east"]) / 2
+    mid_lat = (bounds["south"] + bounds["north"]) / 2
+    return [
+        {"west": bounds["west"], "east": mid_lng, "south": bounds["south"], "north": mid_lat},
+        {"west": mid_lng, "east": bounds["east"], "south": bounds["south"], "north": mid_lat},
+        {"west": bounds["west"], "east": mid_lng, "south": mid_lat, "north": bounds["north"]},
+        {"west": mid_lng, "east": bounds["east"], "south": mid_lat, "north": bounds["north"]},
+    ]
+
+def build_tile_url(zip_code, bounds, base_url=None):
+    """Builds a Zillow for-sale search URL restricted to the given map bounds."""
+    search_query_state = {
+        "usersSearchTerm": zip_code,
+        "mapBounds": bounds,
+        "isMapVisible": True,
+        "isListVisible": True,
+    }
+    query = quote(json.dumps(search_query_state, separators=(",", ":")))
+    return f"{base_url or ZILLOW_BASE_URL}/homes/for_sale/?searchQueryState={query}"
+
+def classify_empty_page(html):
+    """Says why a page yielded no listings: "empty" (a results page with no matches), "blocked" or "unrecognized"."""
+    text = html.lower()
+    if any(marker in text for marker in BLOCK_PAGE_MARKERS):
+        return "blocked"
+    if any(marker in text for marker in RESULTS_PAGE_MARKERS):
+        return "empty"
+    return "unrecognized"
+
+def _fetch_tile(zip_code, tile, fetch_fn, parse_fn, base_url):
+    """Fetches and parses one tile. Returns (properties or None on failure, seconds taken).
+
+    A page without listings is a failure unless it is recognizably an empty results page.
+    """
+    start = time.monotonic()
+    html = fetch_fn(build_tile_url(zip_code, tile["bounds"], base_url))
+    # Tiles parse concurrently, so each gets its own debug file if no listings are found
+    properties = parse_fn(html, debug_file=f"zillow_debug_{zip_code}_{tile['id']}.html") if html else None
+    if properties == []:
+        page = classify_empty_page(html)
+        if page != "empty":
+            logging.warning(f"ZIP {zip_code} tile {tile['id']}: no listings on a {page} page; counting the tile as failed.")
+            properties = None
+    return properties, time.monotonic() - start
+
+def fetch_tiles(zip_code, bounds, fetch_fn, parse_fn, journal=None, result_cap=None, max_depth=None,
+                max_workers=None, base_url=None, keep_going=None):
+    """Fetches every tile needed to cover `bounds`, subdividing tiles that hit the result cap.
+
+    `fetch_fn(url)` returns HTML or None and `parse_fn(html, debug_file=...)` returns a list of property dicts
+    (normally fetch_zillow_data / parse_zillow_html). With a RunJournal, each tile's parsed listings
+    are checkpointed under fetch key "<zip>:<tile_id>" and reused on resume.
+    `keep_going()` is checked between tiles; once it returns False no further tiles are fetched (they are
+    reported as "aborted"), e.g. when a worker has lost its job lease.
+
+    Returns (properties deduplicated by MLS ID, stats dict).
+    """
+    result_cap = result_cap or TILE_RESULT_CAP
+    max_depth = TILE_MAX_DEPTH if max_depth is None else max_depth
+    max_workers = max_workers or TILE_MAX_WORKERS
+
+    listings_by_mls = {} # In-memory index: MLS ID -> property (first tile to see it wins)
+    tile_stats = []
+    duplicates = 0
+
+    def add_properties(properties):
+        nonlocal duplicates
+        for prop in properties:
+            mls_id = prop.get('MLS ID')
+            if not mls_id:
+                continue
+            if mls_id in listings_by_mls:
+                duplicates += 1
+            else:
+                listings_by_mls[mls_id] = prop
+
+    def handle_result(tile, properties, seconds, pending):
+        """Records a finished tile; queues its children if it looks truncated."""
+        stat = {"tile_id": tile["id"], "depth": tile["depth"], "seconds": round(seconds, 2),
+                "count": len(properties) if properties is not None else 0}
+        if properties is None:
+            stat["status"] = "failed"
+        else:
+            add_properties(properties)
+            if not properties:
+                stat["status"] = "empty" # Verified empty results page (see _fetch_tile); counts as covered
+            elif len(properties) < result_cap:
+                stat["status"] = "complete"
+            elif tile["depth"] < max_depth:
+                stat["status"] = "split"
+                for index, child_bounds in enumerate(split_bounds(tile["bounds"])):
+                    pending.append({"id": f"{tile['id']}{index}", "depth": tile["depth"] + 1, "bounds": child_bounds})
+            else:
+                stat["status"] = "capped" # Still truncated at max depth; coverage may be incomplete
+        tile_stats.append(stat)
+
+    def abort_tile(tile):
+        tile_stats.append({"tile_id": tile["id"], "depth": tile["depth"], "seconds": 0.0, "count": 0, "status": "aborted"})
+
+    start = time.monotonic()
+    pending = [{"id": "r", "depth": 0, "bounds": bounds}]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        running = {}
+        while pending or running:
+            if keep_going and not keep_going():
+                # Drop queued tiles and cancel fetches that haven't started; ones in flight still finish
+                for tile in pending:
+                    abort_tile(tile)
+                pending.clear()
+                for future in [f for f in running if f.cancel()]:
+                    abort_tile(running.pop(future))
+            # Reuse checkpointed tiles; submit the rest
+            while pending:
+                tile = pending.pop(0)
+                tile_key = f"{zip_code}:{tile['id']}"
+                cached = journal.get_result("fetch", tile_key) if journal else None
+                if cached is not None:
+                    handle_result(tile, cached, 0.0, pending)
+                    continue
+                running[executor.submit(_fetch_tile, zip_code, tile, fetch_fn, parse_fn, base_url)] = tile
+            if not running:
+                continue
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                tile = running.pop(future)
+                tile_key = f"{zip_code}:{tile['id']}"
+                try:
+                    properties, seconds = future.result()
+                except Exception as e:
+                    logging.error(f"ZIP {zip_code} tile {tile['id']}: {type(e).__name__} - {e}")
+                    properties, seconds = None, 0.0
+                if journal:
+                    if properties is None:
+                        journal.mark_failed("fetch", tile_key, "tile fetch failed")
+                    else:
+                        journal.mark_done("fetch", tile_key, result=properties)
+                handle_result(tile, properties, seconds, pending)
+
+    stats = _summarize_tiles(zip_code, tile_stats, len(listings_by_mls), duplicates, time.monotonic() - start)
+    return list(listings_by_mls.values()), stats
+
+def _summarize_tiles(zip_code, tile_stats, unique_count, duplicates, elapsed):
+    """Builds coverage/timing statistics for a tiled fetch."""
+    # A tile at depth d covers 1/4^d of the ZIP's bounding box. Coverage counts the area of
+    # leaf tiles whose listings were fully fetched (not failed, not still capped).
+    covered = sum(0.25 ** s["depth"] for s in tile_stats if s["status"] in ("complete", "empty"))
+    timings = sorted(s["seconds"] for s in tile_stats if s["seconds"] > 0)
+    by_status = {}
+    for s in tile_stats:
+        by_status[s["status"]] = by_status.get(s["status"], 0) + 1
+    return {
+        "zip_code": zip_code,
+        "tiles": len(tile_stats),
+        "by_status": by_status,
+        "coverage": round(covered, 4),
+        "unique_listings": unique_count,
+        "duplicates": duplicates,
+        "elapsed_seconds": round(elapsed, 2),
+        "tile_seconds_min": timings[0] if timings else 0.0,
+        "tile_seconds_median": timings[len(timings) // 2] if timings else 0.0,
+        "tile_seconds_max": timings[-1] if timings else 0.0,
+        "tile_stats": sorted(tile_stats, key=lambda s: s["tile_id"]),
+    }
+
+def log_tile_stats(stats):
+    """Logs a one-line coverage summary plus per-tile timings at debug level."""
+    logging.info(
+        f"ZIP {stats['zip_code']}: {stats['tiles']} tiles {stats['by_status']}, coverage {stats['coverage']:.1%}, "
+        f"{stats['unique_listings']} unique listings ({stats['duplicates']} duplicates dropped) in {stats['elapsed_seconds']}s; "
+        f"tile time min/median/max {stats['tile_seconds_min']}/{stats['tile_seconds_median']}/{stats['tile_seconds_max']}s.")
+    for s in stats["tile_stats"]:
+        logging.debug(f"  tile {s['tile_id']} (depth {s['depth']}): {s['status']}, {s['count']} listings, {s['seconds']}s")
+    if stats["coverage"] < 1:
+        logging.warning(f"ZIP {stats['zip_code']}: only {stats['coverage']:.1%} of the area was fully covered (failed or still-capped tiles).")
+
+# --- Offline Check ---
+
+def start_standin_server(listings, result_cap=TILE_RESULT_CAP):
+    """Starts a local stand-in for Zillow's map-bounds search. Returns (server, base_url).
+
+    `listings` is a list of (mls_id, lat, lng). A search returns, as `list-card` HTML matching
+    parse_zillow_html's selectors, up to `result_cap` listings inside the requested mapBounds
+    (edges inclusive, so listings on a tile boundary appear in both tiles). Call server.shutdown() when done.
+    """
+    class StandinHandler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass # Keep the check's output readable
+
+        def do_GET(self):
+            try:
+                state = json.loads(parse_qs(urlparse(self.path).query)["searchQueryState"][0])
+                b = state["mapBounds"]
+            except (KeyError, IndexError, ValueError):
+                self.send_error(400, "Expected a searchQueryState with mapBounds")
+                return
+            hits = [(mls_id, lat, lng) for mls_id, lat, lng in listings
+                    if b["south"] <= lat <= b["north"] and b["west"] <= lng <= b["east"]][:result_cap]
+            cards = "".join(
+                f'<article class="list-card"><a class="list-card-link" href="/homedetails/{mls_id}/">'
+                f'<address class="list-card-addr">{mls_id} Stand-in St</address></a>'
+                f'<div class="list-card-price">$350,000</div><span data-testid="mls-id">{mls_id}</span></article>'
+                for mls_id, _, _ in hits)
+            body = f'<html><body><div id="grid-search-results">{cards}</div></body></html>'.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandinHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def self_check():
+    """Drives fetch_tiles against the stand-in server and checks splitting, dedup and coverage."""
+    from zillow_airtable_scraper import parse_zillow_html # Real parser, so the stand-in HTML is checked too
+
+    rng = random.Random(7)
+    bounds = {"west": -73.3, "east": -73.1, "south": 44.4, "north": 44.6}
+    mid_lng, mid_lat = -73.2, 44.5
+    listings = []
+    # Dense cluster in the SW quadrant (forces several levels of splitting), sparse listings elsewhere,
+    # and a few listings exactly on the quadrant boundaries (seen by two tiles, must be deduplicated)
+    for i in range(120):
+        listings.append((f"D{i}", rng.uniform(44.401, 44.499), rng.uniform(-73.299, -73.201)))
+    for i in range(20):
+        listings.append((f"S{i}", rng.uniform(44.501, 44.599), rng.uniform(-73.199, -73.101)))
+    listings += [("E0", mid_lat, -73.15), ("E1", 44.55, mid_lng), ("E2", mid_lat, mid_lng), ("E3", 44.45, mid_lng)]
+    expected_ids = {mls_id for mls_id, _, _ in listings}
+
+    server, base_url = start_standin_server(listings, result_cap=40)
+    debug_dir = tempfile.mkdtemp(prefix="tiling_check_")
+    fetch = lambda url: requests.get(url, timeout=10).text
+    parse = lambda html, debug_file: parse_zillow_html(html, debug_file=os.path.join(debug_dir, debug_file))
+    try:
+        # 1. Full coverage: capped tiles split until every leaf is under the cap; overlaps are deduplicated
+        properties, stats = fetch_tiles("05401", bounds, fetch, parse, result_cap=40, max_depth=4, base_url=base_url)
+        log_tile_stats(stats)
+        ids = [p["MLS ID"] for p in properties]
+        assert len(ids) == len(set(ids)), "duplicate MLS IDs returned"
+        assert set(ids) == expected_ids, f"missing listings: {sorted(expected_ids - set(ids))[:10]}"
+        assert stats["by_status"].get("split", 0) >= 2, stats["by_status"]
+        assert not stats["by_status"].get("failed") and not stats["by_status"].get("capped"), stats["by_status"]
+        assert stats["coverage"] == 1.0 and stats["duplicates"] > 0, stats
+
+        # 2. Depth limit: the dense quadrant stays capped and coverage reports the gap
+        _, stats = fetch_tiles("05401", bounds, fetch, parse, result_cap=40, max_depth=1, base_url=base_url)
+        assert stats["by_status"].get("capped") == 1 and stats["coverage"] == 0.75, stats
+
+        # 3. A failing tile is reported, not fatal; the rest of the ZIP is still collected
+        failing_url = build_tile_url("05401", split_bounds(bounds)[2], base_url) # NW quadrant, tile r2
+        flaky = lambda url: None if url == failing_url else fetch(url)
+        properties, stats = fetch_tiles("05401", bounds, flaky, parse, result_cap=40, max_depth=4, base_url=base_url)
+        assert stats["by_status"].get("failed") == 1 and stats["coverage"] == 0.75, stats
+        assert {p["MLS ID"] for p in properties} >= {f"D{i}" for i in range(120)}
+
+        # 4. A CAPTCHA page parses to no listings but must count as failed, not as covered
+        captcha = '<html><body><div id="px-captcha"></div><p>Press &amp; Hold to confirm you are a human</p></body></html>'
+        blocked = lambda url: captcha if url == failing_url else fetch(url)
+        _, stats = fetch_tiles("05401", bounds, blocked, parse, result_cap=40, max_depth=4, base_url=base_url)
+        assert stats["by_status"].get("failed") == 1 and stats["coverage"] == 0.75, stats
+
+        # 5. A results page with no matches is a genuinely empty tile and does count as covered
+        far_away = {"west": -72.3, "east": -72.1, "south": 44.4, "north": 44.6}
+        properties, stats = fetch_tiles("05401", far_away, fetch, parse, result_cap=40, max_depth=4, base_url=base_url)
+        assert properties == [] and stats["by_status"] == {"empty": 1} and stats["coverage"] == 1.0, stats
+    finally:
+        server.shutdown()
+
+    logging.info("Tiling self-check passed.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    self_check()
@@ -0,0 +1,285 @@
+import os
+import sqlite3
+import logging
+import argparse
+from datetime import datetime, timedelta
+
+# Local, append-only history of every listing observation made by the scraper.
+# Airtable only holds the latest state of each listing (rows are upserted in place), so price
+# history and status transitions are kept here and can be queried without calling the Airtable API.
+#
+# Storage is a single SQLite file (stdlib only, no extra dependency):
+#   * observations   - one row per listing per scrape. WITHOUT ROWID table clustered on
+#                      (zip_code, observed_date, ...) so each ZIP/day is a contiguous "partition" on disk.
+#   * listings       - incrementally maintained per-listing aggregates (first/last seen, days on market,
+#                      first/last price, total price delta, current status).
+#   * price_changes  - one row per observed price change, with a covering index for "drops since X" queries.
+#   * status_changes - one row per observed status transition.
+
+DEFAULT_HISTORY_DB = os.getenv("LISTING_HISTORY_DB", "listing_history.db")
+
+# Listing fields copied from parse_zillow_html output into each observation row
+OBSERVED_FIELDS = {
+    'MLS ID': 'mls_id',
+    'Address': 'address',
+    'Price': 'price',
+    'Beds': 'beds',
+    'Baths': 'baths',
+    'Sqft': 'sqft',
+    'URL': 'url',
+    'Status': 'status',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    zip_code TEXT NOT NULL,
+    observed_date TEXT NOT NULL,
+    mls_id TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    price INTEGER,
+    status TEXT,
+    address TEXT,
+    beds INTEGER,
+    baths REAL,
+    sqft INTEGER,
+    url TEXT,
+    PRIMARY KEY (zip_code, observed_date, mls_id, observed_at)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_observations_mls
+    ON observations (mls_id, observed_at, price, status);
+
+CREATE TABLE IF NOT EXISTS listings (
+    mls_id TEXT PRIMARY KEY,
+    zip_code TEXT NOT NULL,
+    address TEXT,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    days_on_market REAL NOT NULL DEFAULT 0,
+    observation_count INTEGER NOT NULL DEFAULT 0,
+    first_price INTEGER,
+    last_price INTEGER,
+    price_change_count INTEGER NOT NULL DEFAULT 0,
+    price_delta_total INTEGER NOT NULL DEFAULT 0,
+    last_price_change_at TEXT,
+    status TEXT,
+    last_status_change_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_listings_zip
+    ON listings (zip_code, last_seen, mls_id, days_on_market, last_price, status);
+
+CREATE TABLE IF NOT EXISTS price_changes (
+    zip_code TEXT NOT NULL,
+    mls_id TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    old_price INTEGER NOT NULL,
+    new_price INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    PRIMARY KEY (mls_id, changed_at)
+) WITHOUT ROWID;
+
+-- Covering indexes: "which listings dropped price since X" never touches the base table
+CREATE INDEX IF NOT EXISTS idx_price_changes_time
+    ON price_changes (changed_at, delta, zip_code, mls_id, old_price, new_price);
+CREATE INDEX IF NOT EXISTS idx_price_changes_zip_time
+    ON price_changes (zip_code, changed_at, delta, mls_id, old_price, new_price);
+
+CREATE TABLE IF NOT EXISTS status_changes (
+    zip_code TEXT NOT NULL,
+    mls_id TEXT NOT NULL,
+    changed_at TEXT NOT NULL,
+    old_status TEXT,
+    new_status TEXT,
+    PRIMARY KEY (mls_id, changed_at)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_status_changes_zip_time
+    ON status_changes (zip_code, changed_at, mls_id, old_status, new_status);
+"""
+
+def connect_history_store(db_path=DEFAULT_HISTORY_DB):
+    """Opens (creating if needed) the listing history database and returns the connection."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the scraper while it appends
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _days_between(start_iso, end_iso):
+    """Returns the (fractional) number of days between two ISO timestamps."""
+    try:
+        return max((datetime.fromisoformat(end_iso) - datetime.fromisoformat(start_iso)).total_seconds() / 86400, 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def record_observations(conn, zip_code, properties, observed_at=None):
+    """Appends one observation per property and updates the per-listing aggregates.
+
+    `properties` is the list of dicts produced by parse_zillow_html. Returns the number of
+    observations written. Re-recording the same (MLS ID, timestamp) is ignored.
+    """
+    observed_at = observed_at or datetime.now().isoformat()
+    observed_date = observed_at[:10]
+    written = 0
+
+    with conn: # Single transaction for the whole batch
+        for prop in properties:
+            mls_id = prop.get('MLS ID')
+            if not mls_id:
+                continue
+            row = {column: prop.get(field) for field, column in OBSERVED_FIELDS.items()}
+            cursor = conn.execute(
+                """INSERT OR IGNORE INTO observations
+                   (zip_code, observed_date, mls_id, observed_at, price, status, address, beds, baths, sqft, url)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (zip_code, observed_date, mls_id, observed_at, row['price'], row['status'],
+                 row['address'], row['beds'], row['baths'], row['sqft'], row['url']))
+            if cursor.rowcount == 0:
+                continue # Already recorded this exact observation
+            written += 1
+            _update_listing_aggregates(conn, zip_code, mls_id, observed_at, row)
+
+    logging.info(f"Recorded {written} listing observations for ZIP {zip_code} in local history.")
+    return written
+
+def _update_listing_aggregates(conn, zip_code, mls_id, observed_at, row):
+    """Folds one new observation into the listings/price_changes/status_changes tables."""
+    price, status = row['price'], row['status']
+    current = conn.execute("SELECT * FROM listings WHERE mls_id = ?", (mls_id,)).fetchone()
+
+    if current is None:
+        conn.execute(
+            """INSERT INTO listings (mls_id, zip_code, address, first_seen, last_seen, days_on_market,
+                                     observation_count, first_price, last_price, status)
+               VALUES (?, ?, ?, ?, ?, 0, 1, ?, ?, ?)""",
+            (mls_id, zip_code, row['address'], observed_at, observed_at, price, price, status))
+        return
+
+    # Observations can arrive out of order (e.g. backfills); only newer ones move "current" state
+    is_latest = observed_at >= current['last_seen']
+    first_seen = min(current['first_seen'], observed_at)
+    last_seen = max(current['last_seen'], observed_at)
+    updates = {
+        'zip_code': zip_code if is_latest else current['zip_code'],
+        'address': (row['address'] or current['address']) if is_latest else current['address'],
+        'first_seen': first_seen,
+        'last_seen': last_seen,
+        'days_on_market': _days_between(first_seen, last_seen),
+        'observation_count': current['observation_count'] + 1,
+        'first_price': current['first_price'] if observed_at >= current['first_seen'] or price is None else price,
+        'last_price': current['last_price'],
+        'price_change_count': current['price_change_count'],
+        'price_delta_total': current['price_delta_total'],
+        'last_price_change_at': current['last_price_change_at'],
+        'status': current['status'],
+        'last_status_change_at': current['last_status_change_at'],
+    }
+
+    if is_latest:
+        old_price = current['last_price']
+        if price is not None:
+            if old_price is not None and price != old_price:
+                delta = price - old_price
+                conn.execute(
+                    """INSERT OR IGNORE INTO price_changes (zip_code, mls_id, changed_at, old_price, new_price, delta)
+                       VALUES (?, ?, ?, ?, ?, ?)""",
+                    (zip_code, mls_id, observed_at, old_price, price, delta))
+                updates['price_change_count'] += 1
+                updates['price_delta_total'] += delta
+                updates['last_price_change_at'] = observed_at
+            updates['last_price'] = price
+            if updates['first_price'] is None:
+                updates['first_price'] = price
+
+        if status and status != current['status']:
+            conn.execute(
+                """INSERT OR IGNORE INTO status_changes (zip_code, mls_id, changed_at, old_status, new_status)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (zip_code, mls_id, observed_at, current['status'], status))
+            updates['status'] = status
+            updates['last_status_change_at'] = observed_at
+
+    assignments = ", ".join(f"{column} = ?" for column in updates)
+    conn.execute(f"UPDATE listings SET {assignments} WHERE mls_id = ?", (*updates.values(), mls_id))
+
+# --- Query API ---
+
+def _since_iso(since=None, days=None):
+    """Resolves a `since` timestamp (ISO string or datetime) or a `days` look-back into an ISO string."""
+    if since is None:
+        since = datetime.now() - timedelta(days=days if days is not None else 7)
+    return since.isoformat() if isinstance(since, datetime) else since
+
+def get_price_drops(conn, since=None, days=None, zip_code=None):
+    """Returns price decreases recorded since `since` (default: the last 7 days), biggest drop first."""
+    params = [_since_iso(since, days)]
+    query = """SELECT zip_code, mls_id, changed_at, old_price, new_price, delta
+               FROM price_changes WHERE changed_at >= ? AND delta < 0"""
+    if zip_code:
+        query += " AND zip_code = ?"
+        params.append(zip_code)
+    query += " ORDER BY delta ASC"
+    return [dict(r) for r in conn.execute(query, params)]
+
+def get_status_changes(conn, since=None, days=None, zip_code=None):
+    """Returns status transitions (e.g. For Sale -> Pending) recorded since `since`."""
+    params = [_since_iso(since, days)]
+    query = "SELECT zip_code, mls_id, changed_at, old_status, new_status FROM status_changes WHERE changed_at >= ?"
+    if zip_code:
+        query += " AND zip_code = ?"
+        params.append(zip_code)
+    query += " ORDER BY changed_at DESC"
+    return [dict(r) for r in conn.execute(query, params)]
+
+def get_price_history(conn, mls_id):
+    """Returns every observation of a listing's price and status, oldest first."""
+    return [dict(r) for r in conn.execute(
+        "SELECT observed_at, price, status FROM observations WHERE mls_id = ? ORDER BY observed_at", (mls_id,))]
+
+def get_listing_summaries(conn, zip_code=None, min_days_on_market=None):
+    """Returns the per-listing aggregates (days on market, price deltas, current status)."""
+    query = "SELECT * FROM listings WHERE 1 = 1"
+    params = []
+    if zip_code:
+        query += " AND zip_code = ?"
+        params.append(zip_code)
+    if min_days_on_market is not None:
+        query += " AND days_on_market >= ?"
+        params.append(min_days_on_market)
+    query += " ORDER BY days_on_market DESC"
+    return [dict(r) for r in conn.execute(query, params)]
+
+def get_observations(conn, zip_code, start_date, end_date=None):
+    """Returns raw observations for one ZIP between two dates (YYYY-MM-DD, inclusive)."""
+    return [dict(r) for r in conn.execute(
+        """SELECT * FROM observations WHERE zip_code = ? AND observed_date BETWEEN ? AND ?
+           ORDER BY observed_date, mls_id, observed_at""",
+        (zip_code, start_date, end_date or start_date))]
+
+# --- Command Line ---
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Query the local Zillow listing history.")
+    parser.add_argument("query", choices=["price-drops", "status-changes", "history", "summary"])
+    parser.add_argument("--db", default=DEFAULT_HISTORY_DB, help="Path to the history database")
+    parser.add_argument("--zip", dest="zip_code", help="Restrict to one ZIP code")
+    parser.add_argument("--days", type=float, default=7, help="Look-back window in days (default: 7)")
+    parser.add_argument("--mls-id", help="Listing to show history for (with 'history')")
+    args = parser.parse_args()
+
+    conn = connect_history_store(args.db)
+    if args.query == "price-drops":
+        rows = get_price_drops(conn, days=args.days, zip_code=args.zip_code)
+    elif args.query == "status-changes":
+        rows = get_status_changes(conn, days=args.days, zip_code=args.zip_code)
+    elif args.query == "history":
+        if not args.mls_id:
+            parser.error("--mls-id is required for 'history'")
+        rows = get_price_history(conn, args.mls_id)
+    else:
+        rows = get_listing_summaries(conn, zip_code=args.zip_code)
+    for row in rows:
+        print(row)
+    conn.close()
@@ -0,0 +1,110 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+# Durable, append-only journal of a scraper run so a crashed or partially failed run can be resumed.
+#
+# Each line is one JSON event: {"kind": ..., "key": ..., "state": "done"|"failed", ...}.
+#   kind "fetch"  - key "<zip>:p<page>"   a search page was fetched
+#   kind "parse"  - key "<zip>"           listings were parsed (the parsed rows are stored in "result")
+#   kind "upsert" - key "<zip>:<hash>"    an Airtable upsert chunk (identified by a hash of its MLS IDs) was acknowledged
+#   kind "sink"   - key "<zip>:<sink>:<path>"  MLS IDs a local sink (CSV/NDJSON/SQLite) has durably written for the ZIP
+#   kind "history" - key "<zip>"          MLS IDs already recorded in the listing history for this ZIP
+#   kind "claim"  - key "<zip>"           --worker mode: the job enqueue (enqueue_id in "result") this journal's ZIP checkpoints belong to
+#   kind "forget" - key "<zip>"           earlier work for this ZIP no longer counts (it is being re-scraped)
+# Every event is flushed and fsync'd before the run moves on, so anything marked "done" survives a crash.
+# A torn final line (crash mid-write) is ignored when the journal is replayed.
+
+DEFAULT_JOURNAL_PATH = os.getenv("SCRAPER_JOURNAL_PATH", "scraper_run.journal.jsonl")
+
+class RunJournal:
+    """Records completed/failed units of work and answers "can this unit be skipped?" on resume."""
+
+    def __init__(self, path=DEFAULT_JOURNAL_PATH, resume=False):
+        self.path = path
+        self._state = {} # (kind, key) -> last event for that unit
+        self._lock = threading.Lock() # Sink threads record upsert chunks while the main thread records fetches
+        if resume and os.path.exists(path):
+            self._replay()
+            logging.info(f"Resuming from journal '{path}': {self._count('done')} units done, {self._count('failed')} failed previously.")
+        else:
+            if resume:
+                logging.warning(f"No journal found at '{path}'. Starting a fresh run.")
+            open(path, "w").close() # Truncate: a fresh run starts a fresh journal
+        self._file = open(path, "a", encoding="utf-8")
+        self._write({"kind": "run", "key": "start", "state": "started", "resume": bool(resume)})
+
+    def _replay(self):
+        """Loads the last recorded state of every unit from the journal file."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    logging.warning(f"Ignoring unreadable journal line {line_number} (likely interrupted write).")
+                    continue
+                if event.get("kind") == "run":
+                    continue
+                if event.get("kind") == "forget":
+                    self._drop_zip(event.get("key"))
+                    continue
+                self._state[(event.get("kind"), event.get("key"))] = event
+
+    def _write(self, event):
+        """Appends one event and forces it to disk."""
+        event["ts"] = datetime.now().isoformat()
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _count(self, state):
+        return sum(1 for event in self._state.values() if event.get("state") == state)
+
+    def is_done(self, kind, key):
+        """True if this unit completed in this run or in the run being resumed."""
+        event = self._state.get((kind, key))
+        return bool(event) and event.get("state") == "done"
+
+    def get_result(self, kind, key):
+        """Returns the result stored with a completed unit (e.g. parsed listings), or None."""
+        event = self._state.get((kind, key))
+        return event.get("result") if event and event.get("state") == "done" else None
+
+    def mark_done(self, kind, key, result=None):
+        event = {"kind": kind, "key": key, "state": "done"}
+        if result is not None:
+            event["result"] = result
+        with self._lock:
+            self._write(event)
+            self._state[(kind, key)] = event
+
+    def mark_failed(self, kind, key, error=None):
+        event = {"kind": kind, "key": key, "state": "failed", "error": str(error) if error else None}
+        with self._lock:
+            self._write(event)
+            self._state[(kind, key)] = event
+
+    def _drop_zip(self, zip_code):
+        for unit in [u for u in self._state if u[1] == zip_code or str(u[1]).startswith(f"{zip_code}:")]:
+            del self._state[unit]
+
+    def forget(self, zip_code):
+        """Discards all recorded work for a ZIP so it is scraped from scratch (e.g. a freshly queued job)."""
+        with self._lock:
+            self._write({"kind": "forget", "key": zip_code, "state": "forgotten"})
+            self._drop_zip(zip_code)
+
+    def failed_units(self):
+        """Returns (kind, key) pairs whose latest state is 'failed'."""
+        with self._lock:
+            return [unit for unit, event in self._state.items() if event.get("state") == "failed"]
+
+    def close(self):
+        if self._file and not self._file.closed:
+            self._write({"kind": "run", "key": "end", "state": "closed", "failed": len(self.failed_units())})
+            self._file.close()
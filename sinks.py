@@ -0,0 +1,282 @@
+import os
+import csv
+import json
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+# Output sinks for parsed listings. Airtable (see AirtableSink in zillow_airtable_scraper.py) is one sink;
+# the local sinks here write the same rows in bulk so large backfills can land on disk at disk speed.
+#
+# SinkFanout feeds any combination of sinks from one parse pass. Each sink runs on its own thread behind its
+# own bounded queue, so fast local sinks never wait on a slow sink (Airtable at 5 req/s): a batch is handed
+# to every sink with room first. The queues are bounded, though, so once the slowest sink's queue is full
+# the producer waits for it, and from then on that sink paces the scrape.
+#
+# With a run journal, each sink records the MLS IDs it has durably written for a ZIP (kind "sink",
+# key "<zip>:<sink name>:<path>"). A later batch for that ZIP, e.g. the full list on --resume after some
+# tiles failed, only writes the listings not recorded yet, so no row is appended to a file twice or lost.
+
+SINK_QUEUE_SIZE = int(os.getenv("SINK_QUEUE_SIZE", "8")) # Batches (one per ZIP/tile set) buffered per sink
+FILE_BUFFER_BYTES = 1024 * 1024 # Buffered I/O for CSV/NDJSON writers
+PARQUET_ROW_GROUP_SIZE = 50000 # Rows buffered before a Parquet row group is written
+
+# Columns written by local sinks: the parsed listing fields plus where/when the row came from
+EXPORT_FIELDS = ['ZIP', 'MLS ID', 'Address', 'Price', 'Beds', 'Baths', 'Sqft', 'URL', 'Status', 'Scraped At']
+
+def _export_rows(zip_code, records, scraped_at):
+    """Adds ZIP and Scraped At columns and keeps only EXPORT_FIELDS, in order."""
+    rows = []
+    for record in records:
+        row = {field: record.get(field) for field in EXPORT_FIELDS}
+        row['ZIP'] = zip_code
+        row['Scraped At'] = scraped_at
+        rows.append(row)
+    return rows
+
+class Sink:
+    """Destination for batches of parsed listings. Subclasses implement write_batch (and close if buffered)."""
+    name = "sink"
+    resumable = True # False if the sink must see every batch again on resume (e.g. it rewrites its output)
+
+    def write_batch(self, zip_code, records, **options):
+        """Writes one batch of records for a ZIP. Returns True on success."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Makes every batch written so far durable. Called before a batch is journaled as done."""
+
+    def close(self):
+        """Flushes buffered output and releases resources."""
+
+class CsvSink(Sink):
+    """Appends rows to a CSV file (header written once, when the file is new)."""
+    name = "csv"
+
+    def __init__(self, path):
+        self.path = path
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="", encoding="utf-8", buffering=FILE_BUFFER_BYTES)
+        self._writer = csv.DictWriter(self._file, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        if is_new:
+            self._writer.writeheader()
+
+    def write_batch(self, zip_code, records, **options):
+        self._writer.writerows(_export_rows(zip_code, records, datetime.now().isoformat()))
+        return True
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+class NdjsonSink(Sink):
+    """Appends one JSON object per row to a newline-delimited JSON file."""
+    name = "ndjson"
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8", buffering=FILE_BUFFER_BYTES)
+
+    def write_batch(self, zip_code, records, **options):
+        rows = _export_rows(zip_code, records, datetime.now().isoformat())
+        self._file.write("".join(json.dumps(row) + "\n" for row in rows))
+        return True
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+class ParquetSink(Sink):
+    """Writes rows to a Parquet file in large row groups. Requires pyarrow (`pip install pyarrow`).
+
+    Parquet files can't be appended to, so each run replaces the file at `path` (and on resume
+    it is fed every batch again, including ones a previous run already wrote).
+    """
+    name = "parquet"
+    resumable = False
+
+    def __init__(self, path, row_group_size=PARQUET_ROW_GROUP_SIZE):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("The parquet sink requires pyarrow. Install it with 'pip install pyarrow'.")
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self.row_group_size = row_group_size
+        self._schema = pa.schema([
+            ('ZIP', pa.string()), ('MLS ID', pa.string()), ('Address', pa.string()), ('Price', pa.int64()),
+            ('Beds', pa.int64()), ('Baths', pa.float64()), ('Sqft', pa.int64()), ('URL', pa.string()),
+            ('Status', pa.string()), ('Scraped At', pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._buffer = []
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        columns = {field: [row[field] for row in self._buffer] for field in EXPORT_FIELDS}
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self._schema))
+        self._buffer = []
+
+    def write_batch(self, zip_code, records, **options):
+        self._buffer.extend(_export_rows(zip_code, records, datetime.now().isoformat()))
+        if len(self._buffer) >= self.row_group_size:
+            self._flush()
+        return True
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+class SqliteSink(Sink):
+    """Appends rows to a `listings_export` table in a SQLite database, one transaction per batch."""
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None # Opened lazily on the sink's own thread (SQLite connections are per-thread)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS listings_export (
+                            zip_code TEXT, mls_id TEXT, address TEXT, price INTEGER, beds INTEGER, baths REAL,
+                            sqft INTEGER, url TEXT, status TEXT, scraped_at TEXT)""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_listings_export_zip ON listings_export (zip_code, scraped_at)")
+        return conn
+
+    def write_batch(self, zip_code, records, **options):
+        if self._conn is None:
+            self._conn = self._connect()
+        rows = _export_rows(zip_code, records, datetime.now().isoformat())
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO listings_export VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [tuple(row[field] for field in EXPORT_FIELDS) for row in rows])
+        return True
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+
+LOCAL_SINKS = {"csv": CsvSink, "ndjson": NdjsonSink, "parquet": ParquetSink, "sqlite": SqliteSink}
+
+def create_local_sink(spec):
+    """Builds a local sink from a 'kind:path' spec, e.g. 'csv:listings.csv' or 'sqlite:export.db'."""
+    kind, _, path = spec.partition(":")
+    if kind not in LOCAL_SINKS or not path:
+        raise ValueError(f"Invalid sink '{spec}'. Use one of {', '.join(f'{k}:PATH' for k in LOCAL_SINKS)} or 'airtable'.")
+    return LOCAL_SINKS[kind](path)
+
+# --- Fan-out ---
+
+class BatchHandle:
+    """Tracks one submitted batch across every sink. wait() returns {sink name: success}."""
+
+    def __init__(self, zip_code, sink_names):
+        self.zip_code = zip_code
+        self._pending = set(sink_names)
+        self.results = {}
+        self._done = threading.Condition()
+
+    def _set(self, sink_name, success):
+        with self._done:
+            self.results[sink_name] = success
+            self._pending.discard(sink_name)
+            self._done.notify_all()
+
+    def wait(self):
+        with self._done:
+            self._done.wait_for(lambda: not self._pending)
+        return self.results
+
+class SinkFanout:
+    """Feeds each batch to every sink, each on its own thread behind its own bounded queue.
+
+    With a journal, a resumable sink only receives the listings of a batch it hasn't already written for that ZIP.
+    """
+
+    def __init__(self, sinks, queue_size=SINK_QUEUE_SIZE, journal=None):
+        names = [sink.name for sink in sinks]
+        if len(set(names)) != len(names):
+            # Give repeated kinds distinct names (e.g. two CSV files) so results stay separate
+            for index, sink in enumerate(sinks):
+                sink.name = f"{sink.name}#{index}"
+        self.sinks = sinks
+        self.journal = journal
+        self._queues = {sink.name: queue.Queue(maxsize=queue_size) for sink in sinks}
+        self._threads = [threading.Thread(target=self._drain, args=(sink,), name=f"sink-{sink.name}", daemon=True)
+                         for sink in sinks]
+        for thread in self._threads:
+            thread.start()
+
+    def _drain(self, sink):
+        sink_queue = self._queues[sink.name]
+        while True:
+            item = sink_queue.get()
+            if item is None:
+                # Close on the sink's own thread (e.g. SQLite connections can't cross threads)
+                try:
+                    sink.close()
+                except Exception as e:
+                    logging.error(f"Error closing sink '{sink.name}': {type(e).__name__} - {e}")
+                return
+            zip_code, records, options, handle = item
+            journal_key = f"{zip_code}:{sink.name}:{getattr(sink, 'path', '')}"
+            journaled = self.journal is not None and sink.resumable
+            if journaled:
+                written = set(self.journal.get_result("sink", journal_key) or [])
+                records = [record for record in records if record.get('MLS ID') not in written]
+                if not records:
+                    logging.info(f"Sink '{sink.name}' already wrote every listing of ZIP {zip_code}; skipping.")
+                    handle._set(sink.name, True)
+                    continue
+                if written:
+                    logging.info(f"Sink '{sink.name}': writing {len(records)} listings of ZIP {zip_code} not written by an earlier batch.")
+            try:
+                success = sink.write_batch(zip_code, records, **options)
+                if success and journaled:
+                    sink.flush() # Rows must be on disk before the journal says they are
+                    written.update(record.get('MLS ID') for record in records)
+                    self.journal.mark_done("sink", journal_key, result=sorted(written))
+            except Exception as e:
+                logging.error(f"Sink '{sink.name}' failed on ZIP {zip_code}: {type(e).__name__} - {e}")
+                success = False
+            handle._set(sink.name, bool(success))
+
+    def submit(self, zip_code, records, **options):
+        """Queues a batch for every sink and returns its BatchHandle.
+
+        Sinks with room get the batch right away; then this blocks until every full queue has room.
+        """
+        handle = BatchHandle(zip_code, [sink.name for sink in self.sinks])
+        # Each sink gets its own copies: sinks may annotate records (e.g. Airtable adds 'Last Seen')
+        items = {sink.name: (zip_code, [dict(record) for record in records], options, handle) for sink in self.sinks}
+        full = []
+        for sink in self.sinks:
+            try:
+                self._queues[sink.name].put_nowait(items[sink.name])
+            except queue.Full:
+                full.append(sink)
+        for sink in full:
+            sink_queue = self._queues[sink.name]
+            logging.info(f"Sink '{sink.name}' is {sink_queue.maxsize} batches behind; waiting for it to catch up.")
+            sink_queue.put(items[sink.name])
+        return handle
+
+    def close(self):
+        """Waits for every queued batch to be written, then closes all sinks."""
+        for sink in self.sinks:
+            self._queues[sink.name].put(None)
+        for thread in self._threads:
+            thread.join()
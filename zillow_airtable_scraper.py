@@ -7,6 +7,15 @@ import logging
 import time
 import random
 from datetime import datetime # For Last Seen timestamp
+import argparse
+import hashlib # Content-based keys for journaled upsert chunks
+from listing_history import connect_history_store, record_observations # Local price/status history
+from run_journal import RunJournal, DEFAULT_JOURNAL_PATH # Checkpointing for --resume
+from geo_tiling import get_zip_bounds, fetch_tiles, log_tile_stats # Map-bounds sub-queries for dense ZIPs
+from job_queue import (DEFAULT_JOBS_DB, LeaseHeartbeat, acquire_write_slot, claim_job, complete_job,
+                       connect_job_store, default_worker_id, job_counts, job_store_label) # Shared job table for --worker mode
+from sinks import Sink, SinkFanout, create_local_sink # Output destinations (Airtable + bulk local writers)
+import threading
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -69,8 +78,11 @@ def fetch_zillow_data(url):
     # Return statement remains outside the 'with' block
     return html_content
 
-def parse_zillow_html(html_content):
-    """Parses the Zillow HTML to extract property listings."""
+def parse_zillow_html(html_content, debug_file="zillow_debug.html"):
+    """Parses the Zillow HTML to extract property listings.
+
+    If no property cards are found, the HTML is saved to `debug_file` for inspecting selectors.
+    """
     if not html_content:
         logging.error("No HTML content received for parsing.")
         return []
@@ -86,7 +98,6 @@ def parse_zillow_html(html_content):
     if not property_cards:
         logging.warning("Could not find property cards using the specified selectors. The website structure might have changed, or the page didn't load correctly (check for CAPTCHAs or blocks).")
         # Save the HTML content for debugging selectors
-        debug_file = "zillow_debug.html"
         try:
             with open(debug_file, "w", encoding="utf-8") as f:
                 f.write(html_content)
@@ -229,9 +240,19 @@ def create_airtable_table(token, base_id, table_name, fields):
     return _call_airtable_meta_api(token, "POST", endpoint, json_data=payload)
 
 # --- End Airtable Metadata API Helpers ---
+# Records per batch_upsert call. Each chunk is acknowledged separately in the run journal,
+# so a failure only costs the chunks that did not go through. (Airtable accepts 10 records per request.)
+UPSERT_CHUNK_SIZE = 10
+
 # Updated function signature: removed table_name parameter
-def send_to_airtable(data, access_token, base_id, zip_code):
-    """Sends the scraped property data to an Airtable table named after the ZIP code."""
+def send_to_airtable(data, access_token, base_id, zip_code, journal=None, write_gate=None):
+    """Sends the scraped property data to an Airtable table named after the ZIP code.
+
+    If a RunJournal is given, upsert chunks already acknowledged in it are skipped and each
+    chunk's outcome is recorded, so a resumed run only retries the chunks that failed.
+    `write_gate`, if given, is called before each upsert chunk; it may block (rate budget) and
+    returning False stops the upload (e.g. a worker lost its job lease).
+    """
     # Determine table name from ZIP code
     table_name = f"ZIP_{zip_code}"
 
@@ -312,23 +333,43 @@ def send_to_airtable(data, access_token, base_id, zip_code):
              # Return True because the process didn't fail, just had nothing to send
              return True
 
-        try:
-            # Perform batch upsert
-            # Note: batch_upsert handles finding records by key_field and updates/creates as needed
-            # It takes a list of records, each wrapped in {"fields": ...}
-            # It also requires a list of key field names (just one in our case)
-            results = table.batch_upsert(records_to_upsert, key_fields=[key_field])
-            processed_count = len(results.get('records', [])) # Count processed records from response
-            logging.info(f"Successfully processed (upserted) {processed_count}/{len(records_to_upsert)} records in Airtable table '{table_name}'.")
-            # Check for potential errors within the batch operation if needed (more complex)
-            # e.g., results might contain error info for specific records
-
-            return processed_count > 0 or len(records_to_upsert) == 0 # Return True if something was processed or if there was nothing to process initially
-
-        except Exception as e:
-            logging.error(f"Error during batch upsert to Airtable table '{table_name}': {e}")
-            # Consider logging the data that failed if possible
+        # Upsert in fixed-size chunks so progress can be checkpointed
+        # Note: batch_upsert handles finding records by key_field and updates/creates as needed
+        # It takes a list of records, each wrapped in {"fields": ...}
+        # It also requires a list of key field names (just one in our case)
+        # Chunks are sorted by MLS ID and journaled by a hash of their MLS IDs rather than their position,
+        # so a resumed run whose list differs (e.g. tiles refetched in another order) never skips unsent records
+        records_to_upsert.sort(key=lambda r: str(r["fields"][key_field]))
+        chunks = [records_to_upsert[i:i + UPSERT_CHUNK_SIZE] for i in range(0, len(records_to_upsert), UPSERT_CHUNK_SIZE)]
+        failed_chunks = 0
+        skipped_chunks = 0
+        for chunk_index, chunk in enumerate(chunks):
+            chunk_ids = ",".join(str(r["fields"][key_field]) for r in chunk)
+            chunk_key = f"{zip_code}:{hashlib.sha1(chunk_ids.encode('utf-8')).hexdigest()[:16]}"
+            if journal and journal.is_done("upsert", chunk_key):
+                skipped_chunks += 1
+                continue
+            if write_gate and not write_gate():
+                logging.error(f"Upload to '{table_name}' stopped before chunk {chunk_index + 1}/{len(chunks)}: write gate refused.")
+                return False
+            try:
+                results = table.batch_upsert(chunk, key_fields=[key_field])
+                # pyairtable may return a dict ({'records': [...]}) or a list depending on version
+                chunk_records = results.get('records', []) if isinstance(results, dict) else results
+                processed_count += len(chunk_records)
+                if journal: journal.mark_done("upsert", chunk_key)
+            except Exception as e:
+                failed_chunks += 1
+                logging.error(f"Error during batch upsert of chunk {chunk_index + 1}/{len(chunks)} to Airtable table '{table_name}': {e}")
+                if journal: journal.mark_failed("upsert", chunk_key, e)
+
+        if skipped_chunks:
+            logging.info(f"Skipped {skipped_chunks}/{len(chunks)} upsert chunks already acknowledged in the run journal.")
+        logging.info(f"Successfully processed (upserted) {processed_count}/{len(records_to_upsert)} records in Airtable table '{table_name}'.")
+        if failed_chunks:
+            logging.error(f"{failed_chunks}/{len(chunks)} upsert chunks failed for table '{table_name}'. Re-run with --resume to retry them.")
             return False
+        return True
 
     except Exception as e:
         # This might catch errors if the table doesn't exist yet
@@ -336,44 +377,312 @@ def send_to_airtable(data, access_token, base_id, zip_code):
         logging.error(f"Ensure table '{table_name}' exists in base '{base_id}' with correct columns (Address, Price, Beds, Baths, Sqft, URL).")
         return False
 
+class AirtableSink(Sink):
+    """Sink that upserts each batch into the `ZIP_{zip}` table via send_to_airtable.
+
+    `fields` optionally limits which listing fields are sent (MLS ID is always kept), so Airtable
+    gets only the subset it needs while local sinks receive full rows.
+    """
+    name = "airtable"
+    resumable = False # Journals its own upsert chunks (see send_to_airtable), so the fan-out doesn't
+
+    def __init__(self, access_token, base_id, journal=None, fields=None):
+        self.access_token = access_token
+        self.base_id = base_id
+        self.journal = journal
+        self.fields = set(fields) | {"MLS ID"} if fields else None
+
+    def write_batch(self, zip_code, records, base_id=None, write_gate=None, **options):
+        if self.fields:
+            records = [{k: v for k, v in record.items() if k in self.fields} for record in records]
+        return send_to_airtable(records, self.access_token, base_id or self.base_id, zip_code,
+                                journal=self.journal, write_gate=write_gate)
+
+def build_sinks(sink_specs, access_token, base_id, journal=None, airtable_fields=None):
+    """Creates sinks from specs like 'airtable', 'csv:out.csv', 'ndjson:out.ndjson', 'parquet:out.parquet', 'sqlite:out.db'."""
+    sinks = []
+    for spec in sink_specs:
+        if spec == "airtable":
+            sinks.append(AirtableSink(access_token, base_id, journal=journal, fields=airtable_fields))
+        else:
+            sinks.append(create_local_sink(spec))
+    return sinks
+
+# --- Run Orchestration ---
+
+def collect_zip(zip_code, journal=None, tiled=False, keep_going=None):
+    """Fetches, parses and records listings for one ZIP code.
+
+    Returns (properties, fetch_complete); properties is None if nothing could be fetched, and
+    fetch_complete is False if some tiles failed (partial results). With a journal, completed
+    fetch/parse work is reused (parsed rows are stored in the journal). With `tiled`, the ZIP is
+    searched as map-bounds tiles (see geo_tiling) instead of a single `{ZIP}_rb` page.
+    `keep_going()` is checked before every fetch and before recording results; once it returns False
+    (e.g. the worker lost its job lease) the ZIP is abandoned and (None, False) is returned.
+    """
+    def abandoned():
+        if keep_going and not keep_going():
+            logging.error(f"--- ZIP {zip_code}: abandoned mid-scrape (job lease lost); another worker owns it now ---")
+            return True
+        return False
+
+    fetch_key = f"{zip_code}:p1"
+    properties_data = journal.get_result("parse", zip_code) if journal else None
+    fetch_complete = True
+
+    if properties_data is not None:
+        logging.info(f"ZIP {zip_code}: reusing {len(properties_data)} parsed properties from the run journal.")
+    else:
+        if abandoned():
+            return None, False
+        if tiled:
+            bounds = get_zip_bounds(zip_code)
+            if not bounds:
+                logging.error(f"--- ZIP {zip_code}: no bounding box available for tiling ---")
+                if journal: journal.mark_failed("fetch", fetch_key, "no bounding box for tiling")
+                return None, False
+            # Tiles checkpoint themselves in the journal; the ZIP only counts as parsed once every tile succeeded
+            properties_data, tile_stats = fetch_tiles(zip_code, bounds, fetch_zillow_data, parse_zillow_html,
+                                                      journal=journal, keep_going=keep_going)
+            log_tile_stats(tile_stats)
+            fetch_complete = not tile_stats["by_status"].get("failed") and not tile_stats["by_status"].get("aborted")
+            if not properties_data and not fetch_complete:
+                logging.error(f"--- ZIP {zip_code}: every tile fetch failed ---")
+                return None, False
+        else:
+            # Construct the URL from the ZIP code
+            zillow_url_to_scrape = f"https://www.zillow.com/homes/for_sale/{zip_code}_rb/"
+            logging.info(f"Constructed Zillow URL: {zillow_url_to_scrape}")
+
+            html = fetch_zillow_data(zillow_url_to_scrape)
+            if not html:
+                logging.error(f"--- ZIP {zip_code}: failed to fetch Zillow page ---")
+                if journal: journal.mark_failed("fetch", fetch_key, "fetch returned no content")
+                return None, False
+            if journal: journal.mark_done("fetch", fetch_key)
+
+            properties_data = parse_zillow_html(html)
+        if abandoned():
+            return None, False
+        if journal and fetch_complete: journal.mark_done("parse", zip_code, result=properties_data)
+
+        # Listings an earlier (partial) run of this ZIP already recorded, e.g. from tiles reused on --resume,
+        # are the same observation and aren't recorded again
+        recorded = set(journal.get_result("history", zip_code) or []) if journal else set()
+        history_data = [prop for prop in properties_data if prop.get('MLS ID') not in recorded]
+        if history_data:
+            # Append this run's observations to the local listing history (before Airtable overwrites rows)
+            try:
+                history_conn = connect_history_store()
+                record_observations(history_conn, zip_code, history_data)
+                history_conn.close()
+                if journal:
+                    journal.mark_done("history", zip_code, result=sorted(recorded | {prop.get('MLS ID') for prop in history_data}))
+            except Exception as e:
+                # History is a local convenience; never let it block the Airtable upload
+                logging.error(f"Failed to record listing history: {type(e).__name__} - {e}")
+
+    if not fetch_complete:
+        logging.error(f"--- ZIP {zip_code}: some tiles failed; continuing with partial results. Re-run with --resume to fetch the missing tiles ---")
+    return properties_data, fetch_complete
+
+def _log_sink_results(zip_code, results):
+    """Logs which sinks failed for a ZIP. Returns True if every sink succeeded."""
+    failed = [name for name, ok in results.items() if not ok]
+    if failed:
+        logging.error(f"--- ZIP {zip_code}: errors writing to sink(s): {', '.join(failed)} ---")
+    return not failed
+
+def scrape_zip(zip_code, access_token, base_id, journal=None, tiled=False, write_gate=None, fanout=None, keep_going=None):
+    """Fetches, parses, records and uploads listings for one ZIP code. Returns True on success.
+
+    Rows go to every sink of `fanout` (a SinkFanout) if given, otherwise straight to Airtable;
+    either way this waits until the ZIP's rows are written. With a journal, only the upsert
+    chunks not yet acknowledged are sent. `keep_going` is passed to collect_zip and checked again before
+    the rows are handed to the sinks.
+    """
+    properties_data, fetch_complete = collect_zip(zip_code, journal=journal, tiled=tiled, keep_going=keep_going)
+    if properties_data is None:
+        return False
+    if not properties_data:
+        logging.warning(f"--- ZIP {zip_code}: no properties parsed, nothing to send to Airtable ---")
+        return fetch_complete
+
+    if keep_going and not keep_going():
+        logging.error(f"--- ZIP {zip_code}: job lease lost before writing; leaving the ZIP to its new owner ---")
+        return False
+    if fanout:
+        results = fanout.submit(zip_code, properties_data, base_id=base_id, write_gate=write_gate).wait()
+        success = _log_sink_results(zip_code, results)
+    else:
+        success = send_to_airtable(properties_data, access_token, base_id, zip_code, journal=journal, write_gate=write_gate)
+        if not success:
+            logging.error(f"--- ZIP {zip_code}: errors during Airtable upload ---")
+    return success and fetch_complete
+
+def run_worker(jobs_db, worker_id, access_token, default_base_id, journal=None, tiled=False, poll_seconds=None, fanout=None):
+    """Claims ZIP jobs from the shared job table and scrapes them until none are left.
+
+    Each job is held under a lease renewed by a heartbeat thread. Once the lease is lost the worker stops
+    fetching tiles/pages for the ZIP and writes nothing more. Before every Airtable upsert chunk
+    the worker takes a slot from the shared per-base write budget, then confirms and extends its lease
+    in the database.
+    With `poll_seconds`, an idle worker keeps polling for new jobs instead of exiting.
+    Returns the number of jobs that failed in this worker.
+    """
+    conn = connect_job_store(jobs_db)
+    budget_conns = threading.local() # write_gate runs on the Airtable sink's thread; SQLite connections are per-thread
+    failures = 0
+    logging.info(f"Worker {worker_id} started on job table '{job_store_label(jobs_db)}'.")
+    try:
+        while True:
+            job = claim_job(conn, worker_id)
+            if not job:
+                if poll_seconds:
+                    time.sleep(poll_seconds)
+                    continue
+                logging.info(f"Worker {worker_id}: no jobs left {job_counts(conn)}.")
+                return failures
+
+            zip_code = job['zip_code']
+            base_id = job['base_id'] or default_base_id
+            if journal and journal.get_result("claim", zip_code) != job['enqueue_id']:
+                # Checkpoints from an earlier enqueue of this ZIP (e.g. scraped before by this long-lived worker)
+                # are stale, even when the job is reclaimed at attempt 2+. Only this enqueue's own may be reused.
+                journal.forget(zip_code)
+                journal.mark_done("claim", zip_code, result=job['enqueue_id'])
+            heartbeat = LeaseHeartbeat(jobs_db, job).start()
+
+            def write_gate():
+                if heartbeat.lost:
+                    return False # Another worker owns this ZIP now; don't upsert alongside it
+                if not hasattr(budget_conns, "conn"):
+                    budget_conns.conn = connect_job_store(jobs_db)
+                acquire_write_slot(budget_conns.conn, base_id)
+                # Re-check (and extend) the lease in the database right before the write, after any budget wait
+                return heartbeat.confirm(budget_conns.conn)
+
+            error = None
+            try:
+                success = scrape_zip(zip_code, access_token, base_id, journal=journal, tiled=tiled,
+                                     write_gate=write_gate, fanout=fanout, keep_going=lambda: not heartbeat.lost)
+                if not success: error = "scrape_zip reported errors"
+            except Exception as e:
+                success, error = False, f"{type(e).__name__} - {e}"
+                logging.error(f"Unexpected error scraping ZIP {zip_code}: {error}")
+            finally:
+                heartbeat.stop()
+
+            if not heartbeat.lost:
+                complete_job(conn, job, success, error)
+            if not success:
+                failures += 1
+    finally:
+        conn.close()
+
+def parse_zip_codes(value):
+    """Splits a comma/space separated list of ZIP codes, dropping duplicates but keeping order."""
+    zip_codes = []
+    for zip_code in (value or "").replace(",", " ").split():
+        if zip_code not in zip_codes:
+            zip_codes.append(zip_code)
+    return zip_codes
+
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Zillow listings for one or more ZIP codes into Airtable.")
+    parser.add_argument("--zip", dest="zip_codes", help="Comma-separated ZIP codes (default: ZILLOW_ZIP_CODE from .env, which may also be a list)")
+    parser.add_argument("--resume", action="store_true", help="Skip work recorded as done in the run journal and retry only failed units")
+    parser.add_argument("--journal", default=DEFAULT_JOURNAL_PATH, help=f"Run journal path (default: {DEFAULT_JOURNAL_PATH})")
+    parser.add_argument("--tiles", action="store_true", help="Split each ZIP into map-bounds tiles fetched in parallel (for ZIPs with more listings than one search page shows)")
+    parser.add_argument("--worker", action="store_true", help="Claim ZIP jobs from the shared job table instead of using --zip/ZILLOW_ZIP_CODE")
+    parser.add_argument("--jobs-db", default=DEFAULT_JOBS_DB, help=f"Job table for --worker mode: a local SQLite file (workers on this host) or a postgresql:// DSN (workers on any host) (default: JOBS_DB or scraper_jobs.db)")
+    parser.add_argument("--worker-id", help="Stable worker name (default: <hostname>-<pid>); also names the worker's journal")
+    parser.add_argument("--poll", type=float, help="In --worker mode, poll for new jobs every N seconds instead of exiting when idle")
+    parser.add_argument("--sink", dest="sinks", action="append",
+                        help="Output destination, repeatable: airtable, csv:PATH, ndjson:PATH, parquet:PATH, sqlite:PATH (default: airtable)")
+    parser.add_argument("--airtable-fields", help="Comma-separated fields to send to Airtable (default: all; MLS ID is always sent)")
+    args = parser.parse_args()
+
     logging.info("--- Starting Zillow Scraper ---")
+    # In worker mode ZIPs come from the job table, so the .env ZIP is not required
+    zip_codes = [] if args.worker else parse_zip_codes(args.zip_codes or ZILLOW_ZIP_CODE)
+    sink_specs = args.sinks or ["airtable"]
+    uses_airtable = "airtable" in sink_specs
 
     # 1. Check Credentials
     # Updated check: Removed AIRTABLE_TABLE_NAME
-    if not all([AIRTABLE_ACCESS_TOKEN, AIRTABLE_BASE_ID, ZILLOW_ZIP_CODE]):
+    # Airtable credentials are only needed when Airtable is one of the sinks
+    if not all([AIRTABLE_ACCESS_TOKEN or not uses_airtable, AIRTABLE_BASE_ID or not uses_airtable, zip_codes or args.worker]):
         logging.error("One or more required environment variables (Airtable Access Token, Base ID, Zillow ZIP Code) are missing in .env. Please run config_app.py first. Exiting.")
         exit(1)
     # Updated placeholder/format check: Removed AIRTABLE_TABLE_NAME
-    if "YOUR_" in AIRTABLE_ACCESS_TOKEN or not AIRTABLE_ACCESS_TOKEN.startswith("pat") \
-       or "YOUR_" in AIRTABLE_BASE_ID \
-       or not (ZILLOW_ZIP_CODE and ZILLOW_ZIP_CODE.isdigit() and len(ZILLOW_ZIP_CODE) == 5):
+    if (uses_airtable and ("YOUR_" in AIRTABLE_ACCESS_TOKEN or not AIRTABLE_ACCESS_TOKEN.startswith("pat") \
+       or "YOUR_" in AIRTABLE_BASE_ID)) \
+       or not all(z.isdigit() and len(z) == 5 for z in zip_codes):
          logging.warning("Placeholder values or invalid token/Base ID/ZIP code format detected in .env file. Please run config_app.py to set actual credentials and ZIP Code.")
          exit(1) # Exit if placeholders/invalid format found
 
-    # 2. Construct Zillow URL and Fetch Data
-    # Construct the URL from the ZIP code
-    zillow_url_to_scrape = f"https://www.zillow.com/homes/for_sale/{ZILLOW_ZIP_CODE}_rb/"
-    logging.info(f"Constructed Zillow URL: {zillow_url_to_scrape}")
-
-    html = fetch_zillow_data(zillow_url_to_scrape)
-
-    if html:
-        # 3. Parse Data
-        properties_data = parse_zillow_html(html)
-
-        if properties_data:
-            # 4. Send to Airtable
-            # Updated to pass ZILLOW_ZIP_CODE instead of table name
-            success = send_to_airtable(properties_data, AIRTABLE_ACCESS_TOKEN, AIRTABLE_BASE_ID, ZILLOW_ZIP_CODE)
-            if success:
-                logging.info("--- Scraper finished successfully ---")
-            else:
-                logging.error("--- Scraper finished with errors during Airtable upload ---")
-        else:
-            logging.warning("--- No properties parsed, nothing to send to Airtable ---")
+    # 2. Set up the run journal and output sinks
+    if args.worker:
+        worker_id = args.worker_id or default_worker_id()
+        # Each worker keeps its own journal so workers on one host don't share checkpoint files
+        journal_path = args.journal if args.journal != DEFAULT_JOURNAL_PATH else f"scraper_run.{worker_id}.journal.jsonl"
+    else:
+        journal_path = args.journal
+    journal = RunJournal(journal_path, resume=args.resume)
+    airtable_fields = [f.strip() for f in (args.airtable_fields or "").split(",") if f.strip()]
+    try:
+        sinks = build_sinks(sink_specs, AIRTABLE_ACCESS_TOKEN, AIRTABLE_BASE_ID, journal=journal, airtable_fields=airtable_fields)
+    except (ValueError, RuntimeError) as e:
+        journal.close()
+        logging.error(f"{e} Exiting.")
+        exit(1)
+    fanout = SinkFanout(sinks, journal=journal)
+    logging.info(f"Writing to sink(s): {', '.join(sink.name for sink in sinks)}")
+
+    # 3a. Worker mode: claim ZIP jobs from the shared job table until none are left
+    if args.worker:
+        try:
+            failures = run_worker(args.jobs_db, worker_id, AIRTABLE_ACCESS_TOKEN, AIRTABLE_BASE_ID,
+                                  journal=journal, tiled=args.tiles, poll_seconds=args.poll, fanout=fanout)
+        finally:
+            fanout.close()
+            journal.close()
+        logging.info(f"--- Worker {worker_id} finished ({failures} failed jobs) ---")
+        exit(1 if failures else 0)
+
+    # 3b. Scrape each ZIP, checkpointing progress so a failed run can be resumed.
+    # Parsed rows are handed to the sinks without waiting, so the next ZIP is fetched while they write.
+    failed_zips = []
+    handles = []
+    try:
+        for zip_code in zip_codes:
+            try:
+                properties_data, fetch_complete = collect_zip(zip_code, journal=journal, tiled=args.tiles)
+                if properties_data is None or not fetch_complete:
+                    failed_zips.append(zip_code)
+                if not properties_data:
+                    if properties_data is not None:
+                        logging.warning(f"--- ZIP {zip_code}: no properties parsed, nothing to send to sinks ---")
+                    continue
+                handles.append(fanout.submit(zip_code, properties_data))
+            except Exception as e:
+                # Keep going: one bad ZIP shouldn't throw away the rest of a long run
+                logging.error(f"Unexpected error scraping ZIP {zip_code}: {type(e).__name__} - {e}")
+                failed_zips.append(zip_code)
+    finally:
+        fanout.close() # Waits for every sink to finish its queued batches
+        journal.close()
+
+    for handle in handles:
+        if not _log_sink_results(handle.zip_code, handle.wait()) and handle.zip_code not in failed_zips:
+            failed_zips.append(handle.zip_code)
+
+    if failed_zips:
+        logging.error(f"--- Scraper finished with errors for {len(failed_zips)}/{len(zip_codes)} ZIP codes: {', '.join(failed_zips)}. Re-run with --resume to retry only the failed work ---")
     else:
-        logging.error("--- Failed to fetch Zillow page, scraper aborted ---")
+        logging.info("--- Scraper finished successfully ---")
 
     logging.info("--- Zillow Scraper finished ---")
+    exit(1 if failed_zips else 0)